@@ -1,12 +1,21 @@
+import os
+import time
+
+START_TIME = time.perf_counter()
+
 import pygame
-from solver import show_mode_screen
 
-pygame.init()
+import assets
+
+# With this set the game prints the time to the first menu frame and exits;
+# benchmark.py startup uses it.
+STARTUP_CHECK = os.environ.get("HASHI_STARTUP_CHECK")
 
 WINDOW_WIDTH = 880
 WINDOW_HEIGHT = 720
-screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
-pygame.display.set_caption("Hashi Puzzle Game")
+# Created in main(); the game screen (solver) is only imported once a mode
+# is chosen and draws on the same window.
+screen = None
 
 # island 
 
@@ -46,21 +55,7 @@ hard_matrix = [
     [0, 2, 0, 0, 0, 0, 0, 0, 6, 0, 4],  # row 8
 ]
 
-# Prefer jpg then png.
 BG = None
-try: 
-    BG = pygame.image.load("background.jpg").convert()
-except Exception:
-    try:
-        BG = pygame.image.load("background.png").convert()
-    except Exception:
-        BG = None
-
-if BG:
-    try:
-        BG = pygame.transform.scale(BG, (WINDOW_WIDTH, WINDOW_HEIGHT))
-    except Exception:
-        pass
 
 def easy_mode():
     pygame.display.set_caption("Easy Mode - Hashi Puzzle Game")
@@ -92,9 +87,9 @@ def main_menu():
 
     Buttons highlight on hover and respond to left-click.
     """
-    font = pygame.font.SysFont(None, 55)
-    small_font = pygame.font.SysFont(None, 28)
-    title_font = pygame.font.SysFont(None, 86, bold=True)
+    font = assets.get_font(55)
+    small_font = assets.get_font(28)
+    title_font = assets.get_font(86, bold=True)
 
     # Button layout
     btn_width = 320
@@ -107,6 +102,7 @@ def main_menu():
     medium_rect = pygame.Rect(btn_x, btn_y_start + (btn_height + btn_gap), btn_width, btn_height)
     hard_rect = pygame.Rect(btn_x, btn_y_start + 2 * (btn_height + btn_gap), btn_width, btn_height)
 
+    first_frame = True
     while True:
         mouse_pos = pygame.mouse.get_pos()
         mouse_pressed = pygame.mouse.get_pressed()
@@ -153,10 +149,23 @@ def main_menu():
         screen.blit(instruct, (WINDOW_WIDTH // 2 - instruct.get_width() // 2, WINDOW_HEIGHT - 60))
 
         pygame.display.flip()
+        if first_frame:
+            first_frame = False
+            if STARTUP_CHECK:
+                print(f"time to first frame: {time.perf_counter() - START_TIME:.4f}s")
+                return
         clock.tick(FPS)
 
 
 def main():
+    global screen, BG
+    # Only what the game uses; pygame.init() would also start audio.
+    pygame.display.init()
+    pygame.font.init()
+    screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+    pygame.display.set_caption("Hashi Puzzle Game")
+    # Prefer jpg then png.
+    BG = assets.load_background(("background.jpg", "background.png"), (WINDOW_WIDTH, WINDOW_HEIGHT))
     try:
         main_menu()
     finally:
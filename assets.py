@@ -0,0 +1,78 @@
+"""Fonts and images shared by the menu and the game screen.
+
+Everything is created on first use, so importing this (or the screens
+using it) costs nothing before a window exists.
+"""
+import os
+import re
+
+import pygame
+
+CACHE_DIR = ".cache"
+
+_fonts = {}
+
+
+def get_font(size, bold=False):
+    """Default font at a size, created once.
+
+    Same as pygame.font.SysFont(None, size, bold) without scanning the
+    system fonts first, which is slow.
+    """
+    key = (size, bold)
+    font = _fonts.get(key)
+    if font is None:
+        font = pygame.font.Font(None, size)
+        font.set_bold(bold)
+        _fonts[key] = font
+    return font
+
+
+def load_background(paths, size):
+    """First of paths that loads, scaled to size; None if none does.
+
+    The scaled image is cached on disk keyed by the source's mtime and the
+    size, so later starts skip decoding and rescaling it.
+    """
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+
+        name = os.path.basename(path)
+        cached = os.path.join(CACHE_DIR, f"{name}-{size[0]}x{size[1]}-{stat.st_mtime_ns}.bmp")
+        try:
+            return pygame.image.load(cached).convert()
+        except (pygame.error, OSError):
+            pass
+
+        try:
+            image = pygame.image.load(path).convert()
+        except (pygame.error, OSError):
+            continue
+        try:
+            image = pygame.transform.scale(image, size)
+        except (pygame.error, ValueError):
+            return image
+        _save_cached(image, cached, name)
+        return image
+    return None
+
+
+def _save_cached(image, cached, source):
+    """Write the scaled image, dropping older copies of the same source"""
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        # <source>-<width>x<height>-<mtime>.bmp only, so copies of e.g.
+        # background.png or background-dark.jpg survive caching background.jpg.
+        own = re.compile(re.escape(source) + r"-\d+x\d+-\d+\.bmp")
+        for name in os.listdir(CACHE_DIR):
+            if own.fullmatch(name):
+                os.remove(os.path.join(CACHE_DIR, name))
+        temp = cached + ".tmp.bmp"
+        pygame.image.save(image, temp)
+        os.replace(temp, cached)
+    except (pygame.error, OSError):
+        # The cache only saves time; the game runs fine without it.
+        pass
@@ -0,0 +1,164 @@
+"""Benchmarks for the Hashi solver.
+
+Run ``python benchmark.py parallel`` to time the search on the corpus of
+generated large puzzles with different numbers of worker processes,
+``python benchmark.py boards`` to compare building a puzzle's Board with
+fetching the shared one from the cache, and ``python benchmark.py startup``
+to check the game's time to first frame against STARTUP_TARGET.
+"""
+import argparse
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+import search
+
+# Seconds from launching Hashi.py to its first menu frame, median of runs.
+# The lazy start reaches it in about 0.15s, most of it importing pygame;
+# eager font and image loading took 0.16-0.21s, so keep the margin small.
+STARTUP_TARGET = 0.25
+
+# (size, islands, seed) for every puzzle in the corpus
+CORPUS = [
+    (40, 260, 1),
+    (40, 300, 2),
+    (48, 380, 3),
+    (56, 480, 4),
+    (64, 600, 5),
+]
+
+
+def generate_puzzle(size, count, seed):
+    """Build a solvable size x size puzzle with about count islands.
+
+    Islands are grown one bridge at a time from a random start, so the
+    bridges placed during generation are always a valid solution.
+    """
+    rng = random.Random(seed)
+    islands = {}                # (row, col) -> degree
+    blocked = set()             # cells covered by islands or bridges
+    start = (rng.randrange(size), rng.randrange(size))
+    islands[start] = 0
+    blocked.add(start)
+    placed = [start]
+
+    attempts = 0
+    while len(placed) < count and attempts < count * 60:
+        attempts += 1
+        row, col = rng.choice(placed)
+        d_row, d_col = rng.choice(((0, 1), (0, -1), (1, 0), (-1, 0)))
+        length = rng.randint(2, 6)
+        target = (row + d_row * length, col + d_col * length)
+        if not (0 <= target[0] < size and 0 <= target[1] < size):
+            continue
+        path = [(row + d_row * i, col + d_col * i) for i in range(1, length)]
+        if target in blocked or any(cell in blocked for cell in path):
+            continue
+        bridges = rng.choice((1, 2))
+        islands[(row, col)] += bridges
+        islands[target] = bridges
+        blocked.add(target)
+        blocked.update(path)
+        placed.append(target)
+
+    matrix = [[0] * size for _ in range(size)]
+    for (row, col), degree in islands.items():
+        matrix[row][col] = degree
+    return matrix
+
+
+def corpus():
+    """Matrices of every puzzle in the benchmark corpus"""
+    return [generate_puzzle(size, count, seed) for size, count, seed in CORPUS]
+
+
+def bench_parallel(worker_counts, repeat):
+    matrices = corpus()
+    baseline = None
+    for workers in worker_counts:
+        best = None
+        for _ in range(repeat):
+            # Fresh boards, so no solution or solved region is reused.
+            boards = [search.Board(matrix) for matrix in matrices]
+            start = time.perf_counter()
+            for board in boards:
+                if search.solve_parallel(board, workers) is None:
+                    raise SystemExit("corpus puzzle was not solved")
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        if baseline is None:
+            baseline = best
+        print(f"workers={workers:<3} {best:8.3f}s  speedup x{baseline / best:.2f}")
+
+
+def bench_boards(repeat):
+    matrices = corpus()
+    start = time.perf_counter()
+    for matrix in matrices:
+        search.Board(matrix)
+    cold = (time.perf_counter() - start) / len(matrices)
+
+    for matrix in matrices:
+        search.get_board(matrix)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for matrix in matrices:
+            search.get_board(matrix)
+    warm = (time.perf_counter() - start) / (repeat * len(matrices))
+    print(f"build {cold * 1000:8.3f}ms  cached {warm * 1000:8.3f}ms per puzzle")
+
+
+def bench_startup(runs, target):
+    """Launch the game repeatedly; fail if the median first frame is slow"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, HASHI_STARTUP_CHECK="1")
+    if not env.get("DISPLAY") and not env.get("WAYLAND_DISPLAY"):
+        env.setdefault("SDL_VIDEODRIVER", "dummy")
+
+    in_process = []
+    wall = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, "Hashi.py"], cwd=here, env=env,
+                                capture_output=True, text=True, check=True).stdout
+        wall.append(time.perf_counter() - start)
+        for line in output.splitlines():
+            if line.startswith("time to first frame:"):
+                in_process.append(float(line.split(":")[1].strip().rstrip("s")))
+
+    if not in_process:
+        raise SystemExit("Hashi.py did not report its first frame")
+    first_frame = statistics.median(in_process)
+    print(f"first frame {first_frame:.3f}s after start of Hashi.py, "
+          f"{statistics.median(wall):.3f}s including interpreter start and exit "
+          f"(median of {runs}, target {target:.3f}s)")
+    if first_frame > target:
+        raise SystemExit("startup is slower than the target")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    parallel = sub.add_parser("parallel", help="serial vs parallel search on the corpus")
+    parallel.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parallel.add_argument("--repeat", type=int, default=3)
+    boards = sub.add_parser("boards", help="building vs reusing cached boards")
+    boards.add_argument("--repeat", type=int, default=100)
+    startup = sub.add_parser("startup", help="time to the first frame of the game")
+    startup.add_argument("--runs", type=int, default=5)
+    startup.add_argument("--target", type=float, default=STARTUP_TARGET)
+    args = parser.parse_args()
+
+    if args.command == "parallel":
+        bench_parallel(args.workers, args.repeat)
+    elif args.command == "boards":
+        bench_boards(args.repeat)
+    elif args.command == "startup":
+        bench_startup(args.runs, args.target)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""Load generator for the puzzle service in server.py.
+
+Opens many connections, each playing several sessions at once: load a
+puzzle, make random moves, ask for hints, verify and finally solve.
+
+    python loadgen.py --connections 200 --sessions 10
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import search
+from benchmark import generate_puzzle
+
+
+class Client:
+    """One connection; requests are matched to responses by id"""
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.next_id = 0
+        self.waiting = {}
+        self.latencies = []
+        self.errors = 0
+        self.closed = False
+        self.listener = asyncio.ensure_future(self.listen())
+
+    async def listen(self):
+        try:
+            while True:
+                line = await self.reader.readline()
+                if not line:
+                    break
+                response = json.loads(line)
+                future = self.waiting.pop(response.get("id"), None)
+                if future is not None:
+                    future.set_result(response)
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            # Nothing more will be answered once the connection is gone.
+            self.closed = True
+            for future in self.waiting.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("connection closed"))
+            self.waiting.clear()
+
+    async def call(self, op, **params):
+        self.next_id += 1
+        future = asyncio.get_running_loop().create_future()
+        self.waiting[self.next_id] = future
+        params.update(id=self.next_id, op=op)
+        start = time.perf_counter()
+        try:
+            if self.closed:
+                raise ConnectionError("connection closed")
+            self.writer.write(json.dumps(params).encode() + b"\n")
+            await self.writer.drain()
+            response = await future
+        except ConnectionError as e:
+            self.closed = True
+            self.waiting.pop(params["id"], None)
+            self.errors += 1
+            return {"ok": False, "error": str(e)}
+        self.latencies.append(time.perf_counter() - start)
+        if not response.get("ok"):
+            self.errors += 1
+        return response
+
+    async def close(self):
+        self.writer.close()
+        self.listener.cancel()
+
+
+async def play(client, matrix, moves, rng):
+    board = search.get_board(matrix)
+    response = await client.call("load", matrix=matrix)
+    if not response.get("ok"):
+        return
+    session = response["session"]
+    for _ in range(moves):
+        if client.closed:
+            return
+        roll = rng.random()
+        if roll < 0.1:
+            await client.call("undo", session=session)
+        elif roll < 0.2:
+            await client.call("hint", session=session)
+        elif board.edges:
+            a, b, _ = rng.choice(board.edges)
+            await client.call("move", session=session,
+                              a=board.islands[a][:2], b=board.islands[b][:2])
+    await client.call("verify", session=session)
+    await client.call("solve", session=session)
+    await client.call("close", session=session)
+
+
+async def run_connection(host, port, puzzles, sessions, moves, seed):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port, limit=1 << 20)
+    client = Client(reader, writer)
+    try:
+        await asyncio.gather(*(play(client, rng.choice(puzzles), moves, rng) for _ in range(sessions)))
+    finally:
+        await client.close()
+    return client
+
+
+async def run(args):
+    puzzles = [generate_puzzle(12, 30, seed) for seed in range(args.puzzles)]
+    start = time.perf_counter()
+    clients = await asyncio.gather(*(
+        run_connection(args.host, args.port, puzzles, args.sessions, args.moves, seed)
+        for seed in range(args.connections)
+    ))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(t for client in clients for t in client.latencies)
+    errors = sum(client.errors for client in clients)
+    count = len(latencies)
+    print(f"{args.connections * args.sessions} sessions, {count} requests in {elapsed:.2f}s: "
+          f"{count / elapsed:.0f} req/s, {errors} errors")
+    if latencies:
+        print(f"latency p50 {latencies[count // 2] * 1000:.1f}ms  "
+              f"p99 {latencies[int(count * 0.99)] * 1000:.1f}ms  "
+              f"max {latencies[-1] * 1000:.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load generator for the Hashi service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--connections", type=int, default=200)
+    parser.add_argument("--sessions", type=int, default=10, help="concurrent sessions per connection")
+    parser.add_argument("--moves", type=int, default=20)
+    parser.add_argument("--puzzles", type=int, default=20, help="distinct puzzles to play")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+"""Compact move history for HashiGame.
+
+Every change to the bridges is appended to the log as one packed 32 bit
+entry, including undo and redo, so a recorded log replays a session
+exactly. The low 3 bits hold the action; the rest holds either
+``edge << 4 | old << 2 | new`` for a toggle or the index of the entry an
+undo/redo refers to. Resets and solver results replace every bridge at
+once, their before/after counts are kept next to the entries.
+"""
+from array import array
+
+TOGGLE = 0
+RESET = 1
+SET = 2
+UNDO = 3
+REDO = 4
+
+CHECKPOINT_EVERY = 64
+
+
+def pack_toggle(edge, old, new):
+    return (edge << 4 | old << 2 | new) << 3 | TOGGLE
+
+
+def unpack(entry):
+    """Split an entry into (action, data)"""
+    return entry & 7, entry >> 3
+
+
+def unpack_toggle(data):
+    """Split toggle data into (edge, old, new)"""
+    return data >> 4, data >> 2 & 3, data & 3
+
+
+class MoveLog:
+    """Append-only log of bridge changes with undo/redo and fast seeking"""
+    def __init__(self, edge_count, checkpoint_every=CHECKPOINT_EVERY):
+        self.edge_count = edge_count
+        self.checkpoint_every = checkpoint_every
+        self.entries = array('I')
+        self.counts = bytearray(edge_count)     # bridges after the last entry
+        self.snapshots = {}                     # entry index -> (before, after)
+        self.checkpoints = {0: bytes(edge_count)}
+        self.applied = array('I')               # entries undo can revert
+        self.undone = array('I')                # entries redo can re-apply
+
+    def __len__(self):
+        return len(self.entries)
+
+    def record_toggle(self, edge, old, new):
+        """Record one edge going from old to new bridges"""
+        del self.undone[:]
+        self.counts[edge] = new
+        self.applied.append(len(self.entries))
+        self._append(pack_toggle(edge, old, new))
+
+    def record_bulk(self, action, after):
+        """Record a RESET or SET replacing every bridge count at once"""
+        del self.undone[:]
+        index = len(self.entries)
+        self.snapshots[index] = (bytes(self.counts), bytes(after))
+        self.counts[:] = after
+        self.applied.append(index)
+        self._append(action)
+
+    def undo(self):
+        """Revert the last applied change.
+
+        Returns the (edge, count) pairs to set, or None if there is
+        nothing to undo.
+        """
+        if not self.applied:
+            return None
+        index = self.applied.pop()
+        self.undone.append(index)
+        changes = self._revert(index)
+        self._append(index << 3 | UNDO)
+        return changes
+
+    def redo(self):
+        """Re-apply the last undone change; same return value as undo"""
+        if not self.undone:
+            return None
+        index = self.undone.pop()
+        self.applied.append(index)
+        changes = self._reapply(index)
+        self._append(index << 3 | REDO)
+        return changes
+
+    def seek(self, position):
+        """Bridge counts after the first position entries"""
+        start = position - position % self.checkpoint_every
+        counts = bytearray(self.checkpoints[start])
+        for index in range(start, position):
+            for edge, count in self._effect(index, counts):
+                counts[edge] = count
+        return bytes(counts)
+
+    def to_bytes(self):
+        """Serialize the log; bulk changes store their after counts"""
+        out = array('I', [self.edge_count, len(self.entries)])
+        out.extend(self.entries)
+        data = out.tobytes()
+        for index in sorted(self.snapshots):
+            data += self.snapshots[index][1]
+        return data
+
+    @classmethod
+    def from_bytes(cls, data, checkpoint_every=CHECKPOINT_EVERY):
+        """Rebuild a log by replaying serialized entries"""
+        header = array('I')
+        header.frombytes(data[:header.itemsize * 2])
+        edge_count, length = header
+        entries = array('I')
+        offset = header.itemsize * 2
+        entries.frombytes(data[offset:offset + entries.itemsize * length])
+        offset += entries.itemsize * length
+
+        log = cls(edge_count, checkpoint_every)
+        for entry in entries:
+            action, _ = unpack(entry)
+            if action in (RESET, SET):
+                log.record_bulk(action, data[offset:offset + edge_count])
+                offset += edge_count
+            else:
+                log.apply(entry)
+        return log
+
+    def apply(self, entry):
+        """Append an already packed toggle, undo or redo entry"""
+        action, data = unpack(entry)
+        if action == TOGGLE:
+            self.record_toggle(*unpack_toggle(data))
+        elif action == UNDO:
+            self.undo()
+        elif action == REDO:
+            self.redo()
+        else:
+            raise ValueError("bulk entries need their snapshot, use record_bulk")
+
+    def _append(self, entry):
+        self.entries.append(entry)
+        if len(self.entries) % self.checkpoint_every == 0:
+            self.checkpoints[len(self.entries)] = bytes(self.counts)
+
+    def _effect(self, index, counts):
+        """(edge, count) pairs entry index changes when replayed on counts"""
+        action, data = unpack(self.entries[index])
+        if action == UNDO:
+            return self._revert(data, counts)
+        if action == REDO:
+            return self._reapply(data, counts)
+        return self._reapply(index, counts)
+
+    def _revert(self, index, counts=None):
+        counts = self.counts if counts is None else counts
+        action, data = unpack(self.entries[index])
+        if action == TOGGLE:
+            edge, old, _ = unpack_toggle(data)
+            changes = [(edge, old)]
+        else:
+            before = self.snapshots[index][0]
+            changes = [(e, c) for e, c in enumerate(before) if counts[e] != c]
+        if counts is self.counts:
+            for edge, count in changes:
+                counts[edge] = count
+        return changes
+
+    def _reapply(self, index, counts=None):
+        counts = self.counts if counts is None else counts
+        action, data = unpack(self.entries[index])
+        if action == TOGGLE:
+            edge, _, new = unpack_toggle(data)
+            changes = [(edge, new)]
+        else:
+            after = self.snapshots[index][1]
+            changes = [(e, c) for e, c in enumerate(after) if counts[e] != c]
+        if counts is self.counts:
+            for edge, count in changes:
+                counts[edge] = count
+        return changes
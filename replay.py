@@ -0,0 +1,119 @@
+"""Headless recording and replay of HashiGame sessions.
+
+A session file has one JSON object per line holding the puzzle matrix and
+the base64 encoded move log. Replaying pushes every logged action back
+through HashiGame and checks that the game logs exactly the same entries.
+
+    python replay.py record sessions.jsonl --count 1000
+    python replay.py run sessions.jsonl
+"""
+import argparse
+import base64
+import json
+import random
+import time
+
+import movelog
+from benchmark import generate_puzzle
+from solver import HashiGame
+
+
+def record_session(matrix, moves, seed):
+    """Play random moves on a puzzle and return the game's move log"""
+    rng = random.Random(seed)
+    game = HashiGame(matrix)
+    edges = game.board.edges
+    for _ in range(moves):
+        roll = rng.random()
+        if roll < 0.1:
+            game.undo()
+        elif roll < 0.15:
+            game.redo()
+        elif roll < 0.16:
+            game.reset()
+        elif roll < 0.165:
+            game.solve_puzzle()
+        elif roll < 0.2 and len(game.islands) > 1:
+            # a click on two arbitrary islands, usually rejected
+            game.toggle_bridge(*rng.sample(game.islands, 2))
+        elif edges:
+            a, b, _ = rng.choice(edges)
+            game.toggle_bridge(game.islands[a], game.islands[b])
+    return game.moves
+
+
+def replay_session(matrix, log):
+    """Replay a recorded MoveLog through a fresh HashiGame"""
+    game = HashiGame(matrix)
+    for index, entry in enumerate(log.entries):
+        action, data = movelog.unpack(entry)
+        if action == movelog.TOGGLE:
+            edge, _, _ = movelog.unpack_toggle(data)
+            a, b, _ = game.board.edges[edge]
+            game.toggle_bridge(game.islands[a], game.islands[b])
+        elif action == movelog.RESET:
+            game.reset()
+        elif action == movelog.SET:
+            game.apply_edge_counts(log.snapshots[index][1])
+        elif action == movelog.UNDO:
+            game.undo()
+        elif action == movelog.REDO:
+            game.redo()
+        if len(game.moves) != index + 1 or game.moves.entries[index] != entry:
+            raise ValueError(f"replay diverged at move {index}")
+    return game
+
+
+def write_sessions(path, count, moves, seed):
+    rng = random.Random(seed)
+    with open(path, "w") as f:
+        for _ in range(count):
+            matrix = generate_puzzle(12, rng.randint(12, 30), rng.randrange(1 << 30))
+            log = record_session(matrix, moves, rng.randrange(1 << 30))
+            data = base64.b64encode(log.to_bytes()).decode("ascii")
+            f.write(json.dumps({"matrix": matrix, "moves": data}) + "\n")
+
+
+def read_sessions(path):
+    sessions = []
+    with open(path) as f:
+        for line in f:
+            record = json.loads(line)
+            log = movelog.MoveLog.from_bytes(base64.b64decode(record["moves"]))
+            sessions.append((record["matrix"], log))
+    return sessions
+
+
+def run_sessions(path):
+    sessions = read_sessions(path)
+    total_moves = sum(len(log) for _, log in sessions)
+    start = time.perf_counter()
+    for matrix, log in sessions:
+        game = replay_session(matrix, log)
+        if bytes(game.edge_counts()) != bytes(log.counts):
+            raise ValueError("replayed bridges differ from the recording")
+    elapsed = time.perf_counter() - start
+    print(f"{len(sessions)} sessions, {total_moves} moves in {elapsed:.3f}s: "
+          f"{len(sessions) / elapsed:.0f} sessions/s, {total_moves / elapsed:.0f} moves/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record and replay HashiGame sessions")
+    sub = parser.add_subparsers(dest="command", required=True)
+    record = sub.add_parser("record", help="write random sessions to a file")
+    record.add_argument("path")
+    record.add_argument("--count", type=int, default=1000)
+    record.add_argument("--moves", type=int, default=100)
+    record.add_argument("--seed", type=int, default=0)
+    run = sub.add_parser("run", help="replay every session in a file")
+    run.add_argument("path")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        write_sessions(args.path, args.count, args.moves, args.seed)
+    elif args.command == "run":
+        run_sessions(args.path)
+
+
+if __name__ == '__main__':
+    main()
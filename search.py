@@ -0,0 +1,604 @@
+"""Edge based search for Hashi puzzles.
+
+This module does not touch pygame so the search can run inside worker
+processes. A puzzle is described by a Board (islands, candidate edges and
+the edges that cross each other); a search state is a pair of lists
+``lo``/``hi`` holding the smallest and largest bridge count still allowed
+on every edge.
+
+Boards never change once built, so get_board keeps the most recently used
+ones and every game, session and solve of the same puzzle shares them.
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+from collections import OrderedDict, deque, namedtuple
+
+BOARD_CACHE_SIZE = 128
+
+
+class Board:
+    """Static description of a puzzle used by the search.
+
+    Besides the layout it holds the deductions that need no guessing
+    (forced_lo/forced_hi, None if the puzzle has no solution), a cache of
+    solved regions and, once searched for, the solution.
+    """
+    def __init__(self, matrix):
+        self.matrix = tuple(tuple(row) for row in matrix)
+        self.islands = []           # (row, col, required_degree)
+        self.island_index = {}      # (row, col) -> island index
+        self.edges = []             # (a, b, 'h' or 'v') with a < b
+        self.edge_index = {}        # (a, b) -> edge index
+        self.incident = []          # island index -> edge indexes
+        self.crossings = []         # edge index -> edge indexes it crosses
+
+        for row in range(len(matrix)):
+            for col in range(len(matrix[row])):
+                if matrix[row][col] > 0:
+                    self.island_index[(row, col)] = len(self.islands)
+                    self.islands.append((row, col, matrix[row][col]))
+                    self.incident.append([])
+
+        height = len(matrix)
+        width = max((len(r) for r in matrix), default=0)
+
+        # Every island can only reach the nearest island in each direction,
+        # so looking right and down finds every candidate edge exactly once.
+        for a, (row, col, _) in enumerate(self.islands):
+            for d_row, d_col, kind in ((0, 1, 'h'), (1, 0, 'v')):
+                r, c = row + d_row, col + d_col
+                while r < height and c < width:
+                    b = self.island_index.get((r, c))
+                    if b is not None:
+                        self._add_edge(a, b, kind)
+                        break
+                    r += d_row
+                    c += d_col
+
+        self.crossings = [[] for _ in self.edges]
+        horizontal = [e for e, edge in enumerate(self.edges) if edge[2] == 'h']
+        vertical = [e for e, edge in enumerate(self.edges) if edge[2] == 'v']
+        for h in horizontal:
+            a, b, _ = self.edges[h]
+            h_row, col_min, col_max = self.islands[a][0], self.islands[a][1], self.islands[b][1]
+            for v in vertical:
+                c, d, _ = self.edges[v]
+                v_col, row_min, row_max = self.islands[c][1], self.islands[c][0], self.islands[d][0]
+                if col_min < v_col < col_max and row_min < h_row < row_max:
+                    self.crossings[h].append(v)
+                    self.crossings[v].append(h)
+
+        self.islands = tuple(self.islands)
+        self.edges = tuple(self.edges)
+        self.incident = tuple(tuple(edges) for edges in self.incident)
+        self.crossings = tuple(tuple(edges) for edges in self.crossings)
+
+        lo, hi = self.initial_domains()
+        if propagate(self, lo, hi) and can_connect(self, hi):
+            self.forced_lo, self.forced_hi = tuple(lo), tuple(hi)
+        else:
+            self.forced_lo = self.forced_hi = None
+        self.region_cache = RegionCache()
+        self.solved = False
+        self.solution = None
+
+    def __getstate__(self):
+        # Worker processes get the layout only; the region cache holds live
+        # generators and is rebuilt empty on the other side.
+        state = self.__dict__.copy()
+        del state["region_cache"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.region_cache = RegionCache()
+
+    def _add_edge(self, a, b, kind):
+        self.edge_index[(a, b)] = len(self.edges)
+        self.incident[a].append(len(self.edges))
+        self.incident[b].append(len(self.edges))
+        self.edges.append((a, b, kind))
+
+    def get_edge(self, a, b):
+        """Edge index between two island indexes, or None"""
+        return self.edge_index.get((a, b) if a < b else (b, a))
+
+    def forced_domains(self):
+        """Fresh lo/hi lists holding the forced deductions, or None"""
+        if self.forced_lo is None:
+            return None
+        return list(self.forced_lo), list(self.forced_hi)
+
+    def get_solution(self):
+        """Bridge count per edge of a solution, searched for only once"""
+        if not self.solved:
+            self.set_solution(solve(self))
+        return self.solution
+
+    def set_solution(self, counts):
+        """Remember a solution found elsewhere, e.g. in a worker process"""
+        self.solution = None if counts is None else tuple(counts)
+        self.solved = True
+
+    def initial_domains(self):
+        """Bridge count bounds for every edge before any deduction"""
+        many = len(self.islands) > 2
+        lo = [0] * len(self.edges)
+        hi = []
+        for a, b, _ in self.edges:
+            deg_a, deg_b = self.islands[a][2], self.islands[b][2]
+            limit = min(2, deg_a, deg_b)
+            # Two 1s (or a double bridge between two 2s) would close off a
+            # group of islands from the rest of the puzzle.
+            if many and deg_a == deg_b and deg_a <= 2:
+                limit = min(limit, deg_a - 1)
+            hi.append(limit)
+        return lo, hi
+
+
+def matrix_key(matrix):
+    """Stable hash of a puzzle matrix"""
+    return hashlib.sha1(json.dumps(matrix, separators=(",", ":")).encode()).hexdigest()[:16]
+
+
+_boards = OrderedDict()
+
+
+def get_board(matrix):
+    """Shared Board of a matrix, built on first use and kept in an LRU cache"""
+    key = matrix_key(matrix)
+    board = _boards.get(key)
+    if board is not None:
+        _boards.move_to_end(key)
+        return board
+    board = _boards[key] = Board(matrix)
+    if len(_boards) > BOARD_CACHE_SIZE:
+        _boards.popitem(last=False)
+    return board
+
+
+def propagate(board, lo, hi, start=None, trace=None):
+    """Tighten lo/hi in place using degree and crossing rules.
+
+    Only the islands in start (all islands by default) are checked first;
+    anything they tighten is followed from there. If trace is a list every
+    change is appended to it as (edge, lo, hi, rule). Returns False if the
+    state has no solution.
+    """
+    islands = board.islands
+    incident = board.incident
+    edges = board.edges
+    crossings = board.crossings
+
+    if start is None:
+        start = range(len(islands))
+    queue = deque(start)
+    queued = [False] * len(islands)
+    for a in queue:
+        queued[a] = True
+
+    for a in queue:
+        for e in incident[a]:
+            if lo[e] > 0:
+                for x in crossings[e]:
+                    if lo[x] > 0:
+                        return False
+                    if hi[x] > 0:
+                        hi[x] = 0
+                        if trace is not None:
+                            trace.append((x, 0, 0, "crossing"))
+
+    while queue:
+        a = queue.popleft()
+        queued[a] = False
+        need = islands[a][2]
+        sum_lo = 0
+        sum_hi = 0
+        for e in incident[a]:
+            sum_lo += lo[e]
+            sum_hi += hi[e]
+        if sum_lo > need or sum_hi < need:
+            return False
+        if sum_lo == sum_hi:
+            continue
+
+        for e in incident[a]:
+            old_lo, old_hi = lo[e], hi[e]
+            new_lo = max(old_lo, need - (sum_hi - old_hi))
+            new_hi = min(old_hi, need - (sum_lo - old_lo))
+            if new_lo > new_hi:
+                return False
+            if new_lo == old_lo and new_hi == old_hi:
+                continue
+
+            lo[e], hi[e] = new_lo, new_hi
+            sum_lo += new_lo - old_lo
+            sum_hi += new_hi - old_hi
+            if trace is not None:
+                trace.append((e, new_lo, new_hi, "degree"))
+
+            touched = [e]
+            if old_lo == 0 and new_lo > 0:
+                for x in crossings[e]:
+                    if lo[x] > 0:
+                        return False
+                    if hi[x] > 0:
+                        hi[x] = 0
+                        touched.append(x)
+                        if trace is not None:
+                            trace.append((x, 0, 0, "crossing"))
+            for t in touched:
+                for island in edges[t][:2]:
+                    if not queued[island]:
+                        queued[island] = True
+                        queue.append(island)
+    return True
+
+
+def can_connect(board, hi):
+    """Check that the islands can still form one connected group"""
+    if not board.islands:
+        return True
+    visited = [False] * len(board.islands)
+    visited[0] = True
+    queue = deque([0])
+    seen = 1
+    while queue:
+        a = queue.popleft()
+        for e in board.incident[a]:
+            if hi[e] == 0:
+                continue
+            x, y, _ = board.edges[e]
+            other = y if x == a else x
+            if not visited[other]:
+                visited[other] = True
+                seen += 1
+                queue.append(other)
+    return seen == len(board.islands)
+
+
+def pick_edge(board, lo, hi, candidates=None):
+    """Choose the undecided edge to branch on, or None if all are decided"""
+    if candidates is None:
+        candidates = range(len(board.edges))
+    best = None
+    best_key = None
+    for e in candidates:
+        if lo[e] == hi[e]:
+            continue
+        a, b, _ = board.edges[e]
+        # Prefer edges with fewer choices around the most constrained island.
+        open_a = sum(1 for x in board.incident[a] if lo[x] != hi[x])
+        open_b = sum(1 for x in board.incident[b] if lo[x] != hi[x])
+        key = (hi[e] - lo[e], min(open_a, open_b))
+        if best_key is None or key < best_key:
+            best, best_key = e, key
+            if key == (1, 1):
+                break
+    return best
+
+
+def find_regions(board, edges):
+    """Split undecided edges into groups sharing no island and no crossing.
+
+    Apart from connectivity, the bridges of one group never constrain the
+    bridges of another, so each group can be solved on its own.
+    """
+    parent = {e: e for e in edges}
+
+    def root(e):
+        while parent[e] != e:
+            parent[e] = parent[parent[e]]
+            e = parent[e]
+        return e
+
+    first_at = {}
+    for e in edges:
+        for island in board.edges[e][:2]:
+            other = first_at.setdefault(island, e)
+            if other != e:
+                parent[root(other)] = root(e)
+        for x in board.crossings[e]:
+            if x in parent:
+                parent[root(x)] = root(e)
+
+    regions = {}
+    for e in edges:
+        regions.setdefault(root(e), []).append(e)
+    return list(regions.values())
+
+
+def _region_islands(board, region):
+    return sorted({island for e in region for island in board.edges[e][:2]})
+
+
+class _LazySolutions:
+    """Solutions of one region, produced on demand and kept for reuse"""
+    def __init__(self, region, items):
+        self.region = region
+        self.found = []
+        self.items = items
+
+    def pull(self, index):
+        """Generator passing on search steps until solution index is
+        known; returns the region's bridge counts or None."""
+        while len(self.found) <= index and self.items is not None:
+            item = next(self.items, None)
+            if item is None:
+                self.items = None
+            elif isinstance(item, Step):
+                yield item
+            else:
+                self.found.append(tuple(item[e] for e in self.region))
+        return self.found[index] if index < len(self.found) else None
+
+
+class RegionCache:
+    """LRU cache of region solutions.
+
+    A region is keyed by its edges, their bounds, the bridges its islands
+    still need and how the rest of the board groups its islands, which is
+    everything its solutions depend on. The same region showing up again
+    in another branch of the search (or another solve) reuses them.
+    """
+    def __init__(self, size=4096):
+        self.size = size
+        self.entries = OrderedDict()
+
+    def solutions(self, board, lo, hi, region, depth, nesting):
+        key = self._key(board, lo, hi, region)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            return entry
+        items = _enumerate(board, lo, hi, region, self, depth, nesting + 1)
+        entry = _LazySolutions(region, items)
+        self.entries[key] = entry
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+        return entry
+
+    def _key(self, board, lo, hi, region):
+        inside = set(region)
+        islands = _region_islands(board, region)
+        residual = tuple(
+            board.islands[a][2] - sum(lo[e] for e in board.incident[a] if e not in inside)
+            for a in islands
+        )
+
+        # Label the groups formed by everything outside the region.
+        label = [-1] * len(board.islands)
+        groups = 0
+        for first in range(len(board.islands)):
+            if label[first] >= 0:
+                continue
+            label[first] = groups
+            queue = deque([first])
+            while queue:
+                a = queue.popleft()
+                for e in board.incident[a]:
+                    if hi[e] == 0 or e in inside:
+                        continue
+                    x, y, _ = board.edges[e]
+                    other = y if x == a else x
+                    if label[other] < 0:
+                        label[other] = groups
+                        queue.append(other)
+            groups += 1
+        names = {}
+        context = tuple(names.setdefault(label[a], len(names)) for a in islands)
+
+        return (
+            tuple(region),
+            tuple(lo[e] for e in region),
+            tuple(hi[e] for e in region),
+            residual,
+            groups,
+            context,
+        )
+
+
+# One event of the search:
+#   "deduce"     rule ("degree" or "crossing") narrowed edge to lo..hi
+#   "guess"      edge is tried with lo == hi bridges
+#   "backtrack"  the latest guess failed, rule says why
+#   "solution"   lo holds the bridge count of every edge
+# depth is the number of guesses the event depends on; deductions at
+# depth 0 hold in every solution.
+Step = namedtuple("Step", "kind edge lo hi rule depth")
+
+# Regions are solved by nested generators; past this nesting the search
+# just keeps branching so it stays well inside the stack limit.
+MAX_REGION_NESTING = 40
+
+
+def _enumerate(board, lo, hi, scope, cache, depth=0, nesting=0):
+    """Yield search steps, and every state deciding all edges in scope
+    that can still be completed into a connected solution of the board.
+    States are plain lists so they are easy to tell apart from steps."""
+    # The whole board also checks islands without any candidate edge,
+    # which no region contains.
+    start = None if len(scope) == len(board.edges) else _region_islands(board, scope)
+    stack = [(lo[:], hi[:], depth, None)]
+    while stack:
+        lo, hi, depth, guess = stack.pop()
+        if guess is not None:
+            yield Step("guess", guess, lo[guess], hi[guess], "guess", depth)
+
+        trace = []
+        ok = propagate(board, lo, hi, start, trace)
+        for edge, new_lo, new_hi, rule in trace:
+            yield Step("deduce", edge, new_lo, new_hi, rule, depth)
+        if not ok:
+            yield Step("backtrack", guess, None, None, "contradiction", depth)
+            continue
+        if not can_connect(board, hi):
+            yield Step("backtrack", guess, None, None, "connectivity", depth)
+            continue
+
+        open_edges = [e for e in scope if lo[e] != hi[e]]
+        if not open_edges:
+            yield lo
+            continue
+
+        if nesting < MAX_REGION_NESTING:
+            regions = find_regions(board, open_edges)
+            if len(regions) > 1:
+                yield from _combine(board, lo, hi, regions, cache, depth, nesting)
+                continue
+
+        e = pick_edge(board, lo, hi, open_edges)
+        for value in range(lo[e], hi[e] + 1):
+            new_lo, new_hi = lo[:], hi[:]
+            new_lo[e] = new_hi[e] = value
+            stack.append((new_lo, new_hi, depth + 1, e))
+
+
+def _combine(board, lo, hi, regions, cache, depth, nesting):
+    """Yield the combinations of region solutions that keep the board
+    connected; each region is searched once, not once per combination."""
+    regions.sort(key=len)
+    sequences = [cache.solutions(board, lo, hi, region, depth, nesting) for region in regions]
+    for seq in sequences:
+        if (yield from seq.pull(0)) is None:
+            return
+
+    states = [(lo, hi)]
+    choice = [0] * len(regions)
+    d = 0
+    while d >= 0:
+        if d == len(regions):
+            yield states[d][0]
+            states.pop()
+            d -= 1
+            choice[d] += 1
+            continue
+
+        values = yield from sequences[d].pull(choice[d])
+        if values is None:
+            choice[d] = 0
+            states.pop()
+            d -= 1
+            if d >= 0:
+                choice[d] += 1
+            continue
+
+        new_lo, new_hi = states[d][0][:], states[d][1][:]
+        for e, value in zip(regions[d], values):
+            new_lo[e] = new_hi[e] = value
+        if can_connect(board, new_hi):
+            states.append((new_lo, new_hi))
+            d += 1
+        else:
+            yield Step("backtrack", None, None, None, "connectivity", depth)
+            choice[d] += 1
+
+
+def solve_steps(board, lo=None, hi=None, cache=None):
+    """Generator of the Steps taken while searching for a solution.
+
+    Steps are produced as the search goes, so a caller can stop after the
+    first few (e.g. for a hint) and memory does not grow with the number of
+    steps. Without lo/hi the search starts from an empty board and reports
+    every deduction; the last step is the "solution", if there is one.
+
+    Whenever the undecided edges fall apart into independent regions the
+    regions are solved separately and only their combination is checked
+    for connectivity, so their search costs add up instead of multiplying.
+    """
+    if lo is None:
+        lo, hi = board.initial_domains()
+    if cache is None:
+        cache = board.region_cache
+    for item in _enumerate(board, lo, hi, range(len(board.edges)), cache):
+        if isinstance(item, Step):
+            yield item
+        else:
+            yield Step("solution", None, item, item, "solved", 0)
+            return
+
+
+def format_step(board, step):
+    """One line describing a step, e.g. for writing steps to a file"""
+    if step.edge is None:
+        return f"{step.kind} depth={step.depth} {step.rule}"
+    a, b, _ = board.edges[step.edge]
+    (r1, c1, _), (r2, c2, _) = board.islands[a], board.islands[b]
+    return f"{step.kind} depth={step.depth} ({r1},{c1})-({r2},{c2}) {step.lo}..{step.hi} {step.rule}"
+
+
+def solve(board, lo=None, hi=None, cache=None):
+    """Search for a solution; returns the bridge count per edge or None"""
+    if lo is None:
+        if board.forced_lo is None:
+            return None
+        lo, hi = board.forced_domains()
+    for step in solve_steps(board, lo, hi, cache):
+        if step.kind == "solution":
+            return step.lo
+    return None
+
+
+def split(board, lo, hi, count):
+    """Expand the top of the search tree into at least count subproblems"""
+    frontier = deque([(lo[:], hi[:])])
+    done = []
+    while frontier and len(frontier) + len(done) < count:
+        lo, hi = frontier.popleft()
+        if not propagate(board, lo, hi) or not can_connect(board, hi):
+            continue
+        e = pick_edge(board, lo, hi)
+        if e is None:
+            done.append((lo, hi))
+            continue
+        for value in range(hi[e], lo[e] - 1, -1):
+            new_lo, new_hi = lo[:], hi[:]
+            new_lo[e] = new_hi[e] = value
+            frontier.append((new_lo, new_hi))
+    return done + list(frontier)
+
+
+def solve_matrix(matrix):
+    """Solve a puzzle given as a matrix; convenient for process pools"""
+    return get_board(matrix).get_solution()
+
+
+# Board shared by the tasks of one pool worker, set once by _init_worker;
+# its region cache carries over from one task to the next.
+_worker_board = None
+
+
+def _init_worker(board):
+    global _worker_board
+    _worker_board = board
+
+
+def _solve_task(task):
+    lo, hi = task
+    return solve(_worker_board, lo, hi)
+
+
+def solve_parallel(board, workers=None, split_factor=8):
+    """Solve with a process pool; returns the bridge count per edge or None.
+
+    The top of the search tree is split into many small subproblems which
+    idle workers pull one at a time, so a worker that finishes a dead
+    branch early picks up more work. The first solution found terminates
+    the pool and cancels everything still running.
+    """
+    workers = workers or os.cpu_count() or 1
+    if board.solved or board.forced_lo is None or workers <= 1:
+        return board.get_solution()
+
+    lo, hi = board.forced_domains()
+    result = None
+    tasks = split(board, lo, hi, workers * split_factor)
+    if tasks:
+        with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(board,)) as pool:
+            for result in pool.imap_unordered(_solve_task, tasks):
+                if result is not None:
+                    break
+    board.set_solution(result)
+    return board.solution
@@ -0,0 +1,288 @@
+"""Asyncio puzzle service on top of HashiGame.
+
+Clients speak a line protocol over TCP: every request is one JSON object
+per line and gets one JSON line back carrying the same "id".
+
+    {"id": 1, "op": "load", "matrix": [[2, 0, 2], ...]}
+    {"id": 2, "op": "move", "session": 1, "a": [0, 0], "b": [0, 2]}
+    {"id": 3, "op": "undo", "session": 1}          (and "redo")
+    {"id": 4, "op": "hint", "session": 1}
+    {"id": 5, "op": "verify", "session": 1}
+    {"id": 6, "op": "solve", "session": 1}
+    {"id": 7, "op": "close", "session": 1}
+
+A session only keeps its MoveLog (bridge counts plus history). Requests
+are run on one HashiGame per puzzle which is loaded with the session's log
+first; nothing awaits in between so sessions never see each other's
+state. Solving runs in a bounded process pool and the solution is kept on
+the puzzle's shared search.Board.
+
+    python server.py --port 8765
+"""
+import argparse
+import asyncio
+import json
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import movelog
+import search
+from solver import HashiGame
+
+# Boards are built on the event loop, so loads are capped to keep that
+# cheap (a full 64x64 board with 1000 islands builds in under 0.1s).
+MAX_SIDE = 64
+MAX_ISLANDS = 1000
+
+
+class Puzzle:
+    """A loaded puzzle shared by every session playing it"""
+    __slots__ = ("id", "game", "solving")
+
+    def __init__(self, matrix):
+        self.id = search.matrix_key(matrix)
+        self.game = HashiGame(matrix)
+        self.solving = None     # future of a running solve
+
+
+class Session:
+    """Per client state: the puzzle and the move log"""
+    __slots__ = ("puzzle", "moves")
+
+    def __init__(self, puzzle):
+        self.puzzle = puzzle
+        self.moves = movelog.MoveLog(len(puzzle.game.board.edges))
+
+
+class RequestError(Exception):
+    pass
+
+
+class PuzzleService:
+    """Sessions, puzzles and the solver pool behind the protocol"""
+    def __init__(self, workers=None, max_pending=64):
+        self.workers = workers
+        self.pool = ProcessPoolExecutor(workers)
+        self.max_pending = max_pending
+        self.pending = 0
+        self.puzzles = OrderedDict()
+        self.sessions = {}
+        self.next_session = 1
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+    async def handle(self, request, owned):
+        op = request.get("op")
+        if op == "load":
+            return self.load(request.get("matrix"), owned)
+
+        session_id = request.get("session")
+        if not isinstance(session_id, int) or isinstance(session_id, bool):
+            raise RequestError("session must be an integer")
+        # Only the connection that loaded a session may use it.
+        session = self.sessions.get(session_id) if session_id in owned else None
+        if session is None:
+            raise RequestError("unknown session")
+        if op == "close":
+            del self.sessions[session_id]
+            owned.discard(session_id)
+            return {}
+        if op == "solve":
+            solution = await self.solution(session.puzzle)
+            if solution is None:
+                return {"solved": False}
+            game = self.game_for(session)
+            game.apply_edge_counts(solution)
+            return {"solved": True, "bridges": self.bridges(game)}
+
+        game = self.game_for(session)
+        if op == "move":
+            island1 = self.island(game, request.get("a"))
+            island2 = self.island(game, request.get("b"))
+            if island1 is island2:
+                raise RequestError("a and b are the same island")
+            changed = game.toggle_bridge(island1, island2)
+            return {"changed": changed, "message": game.message}
+        if op == "undo":
+            return {"changed": game.undo(), "message": game.message}
+        if op == "redo":
+            return {"changed": game.redo(), "message": game.message}
+        if op == "hint":
+            hint = game.get_hint()
+            if hint is None:
+                return {"hint": None}
+            return {"hint": [[hint[0].row, hint[0].col], [hint[1].row, hint[1].col]]}
+        if op == "verify":
+            return {"solved": game.check_win()}
+        raise RequestError(f"unknown op {op!r}")
+
+    def load(self, matrix, owned):
+        if (not isinstance(matrix, list) or not matrix
+                or not all(isinstance(row, list) and all(isinstance(v, int) and not isinstance(v, bool)
+                                                         and 0 <= v <= 8 for v in row)
+                           for row in matrix)):
+            raise RequestError("matrix must be a list of rows of integers 0-8")
+        if len(matrix) > MAX_SIDE or any(len(row) > MAX_SIDE for row in matrix):
+            raise RequestError(f"matrix must be at most {MAX_SIDE}x{MAX_SIDE}")
+        if sum(1 for row in matrix for v in row if v) > MAX_ISLANDS:
+            raise RequestError(f"matrix must have at most {MAX_ISLANDS} islands")
+        key = search.matrix_key(matrix)
+        puzzle = self.puzzles.get(key)
+        if puzzle is None:
+            puzzle = self.puzzles[key] = Puzzle(matrix)
+            # Sessions keep evicted puzzles alive for as long as they need.
+            if len(self.puzzles) > search.BOARD_CACHE_SIZE:
+                self.puzzles.popitem(last=False)
+        else:
+            self.puzzles.move_to_end(key)
+        session_id = self.next_session
+        self.next_session += 1
+        self.sessions[session_id] = Session(puzzle)
+        owned.add(session_id)
+        return {"session": session_id, "puzzle": puzzle.id}
+
+    def game_for(self, session):
+        game = session.puzzle.game
+        game.load_moves(session.moves)
+        return game
+
+    def island(self, game, pos):
+        try:
+            island = game.island_grid.get((int(pos[0]), int(pos[1])))
+        except (TypeError, ValueError, IndexError, KeyError):
+            island = None
+        if island is None:
+            raise RequestError(f"no island at {pos!r}")
+        return island
+
+    def bridges(self, game):
+        result = []
+        for (a, b, _), count in zip(game.board.edges, game.edge_counts()):
+            if count:
+                island1, island2 = game.islands[a], game.islands[b]
+                result.append([island1.row, island1.col, island2.row, island2.col, count])
+        return result
+
+    async def solution(self, puzzle):
+        """Cached solution of a puzzle, solving it in the pool if needed"""
+        board = puzzle.game.board
+        if board.solved:
+            return board.solution
+        if puzzle.solving is None:
+            # Refuse new work instead of queueing without bound.
+            if self.pending >= self.max_pending:
+                raise RequestError("busy, retry later")
+            loop = asyncio.get_running_loop()
+            pool = self.pool
+            try:
+                puzzle.solving = loop.run_in_executor(pool, search.solve_matrix, board.matrix)
+            except BrokenProcessPool:
+                # A worker died while the pool was idle; start a fresh one.
+                self._restart_pool(pool)
+                pool = self.pool
+                puzzle.solving = loop.run_in_executor(pool, search.solve_matrix, board.matrix)
+            self.pending += 1
+            puzzle.solving.add_done_callback(lambda future: self._solve_done(puzzle, pool, future))
+        try:
+            # Shielded so a client leaving does not cancel the solve for others.
+            return await asyncio.shield(puzzle.solving)
+        except Exception as e:
+            # A dead worker (BrokenProcessPool) or a crash in the search.
+            raise RequestError(f"solver failed: {type(e).__name__}")
+
+    def _restart_pool(self, pool):
+        """Replace a pool whose worker died, unless already replaced"""
+        if self.pool is pool:
+            pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = ProcessPoolExecutor(self.workers)
+
+    def _solve_done(self, puzzle, pool, future):
+        self.pending -= 1
+        puzzle.solving = None
+        if future.cancelled():
+            return
+        if future.exception() is None:
+            puzzle.game.board.set_solution(future.result())
+        elif isinstance(future.exception(), BrokenProcessPool):
+            self._restart_pool(pool)
+
+    async def respond(self, request, owned, writer):
+        try:
+            if not isinstance(request, dict):
+                raise RequestError("request must be a JSON object")
+            response = await self.handle(request, owned)
+            response["ok"] = True
+        except (RequestError, ValueError) as e:
+            response = {"ok": False, "error": str(e)}
+        except Exception as e:
+            # A bad request must not take down the connection and with it
+            # every session the client owns.
+            response = {"ok": False, "error": f"internal error: {type(e).__name__}"}
+        response["id"] = request.get("id") if isinstance(request, dict) else None
+        try:
+            writer.write(json.dumps(response).encode() + b"\n")
+            await writer.drain()
+        except ConnectionError:
+            # The client left, e.g. during a solve; serve_client cleans up.
+            pass
+
+    async def serve_client(self, reader, writer):
+        owned = set()
+        solving = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    request = None
+                if isinstance(request, dict) and request.get("op") == "solve":
+                    # Solves wait on the pool; answer them out of order so
+                    # they do not hold up the rest of the connection.
+                    task = asyncio.ensure_future(self.respond(request, owned, writer))
+                    solving.add(task)
+                    task.add_done_callback(solving.discard)
+                else:
+                    await self.respond(request, owned, writer)
+            if solving:
+                await asyncio.wait(solving)
+        except ConnectionError:
+            pass
+        finally:
+            for task in solving:
+                task.cancel()
+            for session_id in owned:
+                self.sessions.pop(session_id, None)
+            writer.close()
+
+
+async def serve(host, port, workers, max_pending):
+    service = PuzzleService(workers, max_pending)
+    server = await asyncio.start_server(service.serve_client, host, port, limit=1 << 20)
+    print(f"Hashi service listening on {host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hashi puzzle service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=None, help="solver processes")
+    parser.add_argument("--max-pending", type=int, default=64, help="solves queued before refusing")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.max_pending))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
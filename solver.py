@@ -1,11 +1,14 @@
 import pygame
 from collections import deque
 
-pygame.init()
+import assets
+import movelog
+import search
 
 WINDOW_WIDTH = 880
 WINDOW_HEIGHT = 720
-screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+# The launcher's window; show_mode_screen picks it up when a mode starts.
+screen = None
 
 # Colors
 WHITE = (255, 255, 255)
@@ -25,15 +28,15 @@ cols = WINDOW_WIDTH // tile_size
 FPS = 60
 clock = pygame.time.Clock()
 
-
-# Font for island numbers
-font = pygame.font.Font(None, 36)
-small_font = pygame.font.Font(None, 24)
+# Font sizes for island numbers and status text
+FONT_SIZE = 36
+SMALL_FONT_SIZE = 24
 
 # ========== ISLAND AND GRAPH CLASSES ==========
 class Island:
     """Represents an island node in the puzzle"""
-    def __init__(self, row, col, required_degree):
+    def __init__(self, row, col, required_degree, index=None):
+        self.index = index
         self.row = row
         self.col = col
         self.required_degree = required_degree
@@ -89,12 +92,14 @@ class HashiGame:
         self.message = "Click islands to connect with bridges!"
         self.message_color = WHITE
         
-        for row in range(len(matrix)):
-            for col in range(len(matrix[row])):
-                if matrix[row][col] > 0:
-                    island = Island(row, col, matrix[row][col])
-                    self.islands.append(island)
-                    self.island_grid[(row, col)] = island
+        # The board (islands, edges, crossings) is shared by every game on
+        # the same matrix; only the islands' bridges belong to this game.
+        self.board = search.get_board(matrix)
+        for index, (row, col, degree) in enumerate(self.board.islands):
+            island = Island(row, col, degree, index)
+            self.islands.append(island)
+            self.island_grid[(row, col)] = island
+        self.moves = movelog.MoveLog(len(self.board.edges))
     
     def get_island_at_pos(self, x, y):
         """Get island at screen position"""
@@ -104,27 +109,21 @@ class HashiGame:
     
     def find_path_islands(self, island1, island2):
         """Returns all islands along the path between two islands, or None if invalid"""
-        if island1.row == island2.row:  
-            row = island1.row
-            col_start = min(island1.col, island2.col)
-            col_end = max(island1.col, island2.col)
-            path = []
-            for col in range(col_start + 1, col_end):
-                if (row, col) in self.island_grid:
-                    return None  
-            return (island1, island2, 'h')
-        elif island1.col == island2.col:  
-            col = island1.col
-            row_start = min(island1.row, island2.row)
-            row_end = max(island1.row, island2.row)
-            for row in range(row_start + 1, row_end):
-                if (row, col) in self.island_grid:
-                    return None  
-            return (island1, island2, 'v')
-        return None
+        edge = self.board.get_edge(island1.index, island2.index)
+        if edge is None:
+            return None
+        return (island1, island2, self.board.edges[edge][2])
     
     def check_bridge_crossing(self, island1, island2):
         """Check if adding bridge would cross existing bridges"""
+        edge = self.board.get_edge(island1.index, island2.index)
+        if edge is not None:
+            for other in self.board.crossings[edge]:
+                a, b, _ = self.board.edges[other]
+                if self.islands[a].neighbors.get(self.islands[b], 0):
+                    return True
+            return False
+
         for island_a in self.islands:
             for island_b, count in island_a.neighbors.items():
                 if count == 0:
@@ -158,6 +157,15 @@ class HashiGame:
         return False
 
     def toggle_bridge(self, island1, island2):
+        """Add or cycle bridges between two islands and log the change"""
+        old = island1.neighbors.get(island2, 0)
+        changed = self._toggle_bridge(island1, island2)
+        if changed:
+            edge = self.board.get_edge(island1.index, island2.index)
+            self.moves.record_toggle(edge, old, island1.neighbors.get(island2, 0))
+        return changed
+
+    def _toggle_bridge(self, island1, island2):
         """Add or cycle bridges between two islands"""
         path_info = self.find_path_islands(island1, island2)
         if not path_info:
@@ -237,191 +245,95 @@ class HashiGame:
     def get_possible_neighbors(self, island):
         """Get all islands that could potentially connect to this island"""
         neighbors = []
-        
-        for other in self.islands:
-            if other != island and other.row == island.row:
-                
-                col_min = min(island.col, other.col)
-                col_max = max(island.col, other.col)
-                blocked = False
-                for col in range(col_min + 1, col_max):
-                    if (island.row, col) in self.island_grid:
-                        blocked = True
-                        break
-                if not blocked:
-                    neighbors.append(other)
-        
-        for other in self.islands:
-            if other != island and other.col == island.col:
-                
-                row_min = min(island.row, other.row)
-                row_max = max(island.row, other.row)
-                blocked = False
-                for row in range(row_min + 1, row_max):
-                    if (row, island.col) in self.island_grid:
-                        blocked = True
-                        break
-                if not blocked:
-                    neighbors.append(other)
-        
+        for edge in self.board.incident[island.index]:
+            a, b, _ = self.board.edges[edge]
+            neighbors.append(self.islands[b if a == island.index else a])
         return neighbors
 
     def solve_puzzle(self):
-        """AI Solver using optimized constraint propagation + backtracking"""
+        """AI Solver; the bridges it places are logged as one move"""
+        solved = self._solve_puzzle()
+        self.moves.record_bulk(movelog.SET, self.edge_counts())
+        return solved
+
+    def _solve_puzzle(self):
+        """AI Solver consuming the search's step stream.
+
+        Deductions that need no guessing are kept in solution_steps, in the
+        order they were found.
+        """
         self.solution_steps = []
-        
+        self.step_index = 0
         for island in self.islands:
             island.neighbors.clear()
-        
-        # Try to solve with optimized algorithm
-        max_iterations = 10000 
-        iteration = 0
-        
-        changed = True
-        while changed and iteration < max_iterations:
-            changed = False
-            iteration += 1
-            
-            for island in self.islands:
-                if island.get_current_degree() >= island.required_degree:
-                    continue
 
-                needed = island.required_degree - island.get_current_degree()
-                neighbors = self.get_possible_neighbors(island)
-                
-                # Filter to valid neighbors
-                valid_neighbors = []
-                for neighbor in neighbors:
-                    current_bridges = island.neighbors.get(neighbor, 0)
-                    if current_bridges < 2:
-                        if not self.check_bridge_crossing(island, neighbor):
-                            if island.can_add_bridge(neighbor, current_bridges):
-                                valid_neighbors.append(neighbor)
-                
-                # Forced move: only one possible neighbor
-                if len(valid_neighbors) == 1 and needed > 0:
-                    neighbor = valid_neighbors[0]
-                    bridges_to_add = min(2 - island.neighbors.get(neighbor, 0), needed)
-                    for _ in range(bridges_to_add):
-                        if island.can_add_bridge(neighbor, 0):
-                            island.add_bridge(neighbor)
-                            changed = True
-                else:
-                    # all valid neighbors equals the needed amount, then all
-                    # those capacities must be used.
-                    if needed > 0 and valid_neighbors: # The island still need bridges
-                        cap_list = [] 
-                        total_cap = 0 # How many bridges can be added in total 
-                        for nb in valid_neighbors:
-                            cur = island.neighbors.get(nb, 0)
-                            cap_nb = 2 - cur
-                            # limit by neighbor remaining need
-                            nb_remain = nb.required_degree - nb.get_current_degree()
-                            if nb_remain <= 0:
-                                continue
-                            cap = min(cap_nb, nb_remain)
-                            if cap > 0:
-                                cap_list.append((nb, cap))
-                                total_cap += cap
-
-                        if total_cap > 0 and total_cap == needed:
-                            # enforce these capacities now
-                            for nb, cap in cap_list:
-                                add = min(cap, 2 - island.neighbors.get(nb, 0))
-                                for _ in range(add):
-                                    if island.can_add_bridge(nb, 0) and not self.check_bridge_crossing(island, nb):
-                                        island.add_bridge(nb)
-                                        changed = True
-        
-        # Check if solved
-        if self.check_win():
-            self.message = "Puzzle solved by AI!"
-            self.message_color = GREEN
-            return True
-        
-        # If not fully solved, try lightweight backtracking
-        if self._smart_backtrack(0, 0):
-            self.message = "Puzzle solved by AI!"
-            self.message_color = GREEN
-            return True
-        else:
-            self.message = "Partial solution - try solving manually!"
-            self.message_color = YELLOW
-            return False
+        for step in self.iter_solve_steps():
+            if step.kind == "deduce" and step.depth == 0 and step.lo == step.hi:
+                self.solution_steps.append(step)
+            elif step.kind == "solution":
+                self.set_edge_counts(step.lo)
+                self.message = "Puzzle solved by AI!"
+                self.message_color = GREEN
+                return True
 
-    def _smart_backtrack(self, island_idx, depth):
-        """Optimized recursive backtracking with depth limit"""
-        # Depth limit to prevent freezing
-        if depth > 100:
-            return False
-            
-        # Base case: all islands processed
-        if island_idx >= len(self.islands):
-            return self.check_win()
-        
-        current_island = self.islands[island_idx]
-        
-        # Skip if already satisfied
-        if current_island.get_current_degree() == current_island.required_degree:
-            return self._smart_backtrack(island_idx + 1, depth)
-        
-        # Early termination: if impossible to satisfy
-        needed = current_island.required_degree - current_island.get_current_degree()
-        if needed <= 0:
-            return self._smart_backtrack(island_idx + 1, depth)
-        
-        # Get valid neighbors
-        possible_neighbors = self.get_possible_neighbors(current_island)
-        valid_neighbors = []
-        
-        for neighbor in possible_neighbors:
-            current_bridges = current_island.neighbors.get(neighbor, 0)
-            if current_bridges < 2:
-                if not self.check_bridge_crossing(current_island, neighbor):
-                    if current_island.can_add_bridge(neighbor, current_bridges):
-                        valid_neighbors.append(neighbor)
-        
-        # If no valid neighbors but still needs bridges, fail
-        if not valid_neighbors and needed > 0:
+        self.message = "No solution found!"
+        self.message_color = RED
+        return False
+
+    def iter_solve_steps(self):
+        """Search steps from the current bridges, produced lazily"""
+        lo, hi = self.board.initial_domains()
+        for e, count in enumerate(self.edge_counts()):
+            lo[e] = count
+            hi[e] = max(hi[e], count)
+        return search.solve_steps(self.board, lo, hi)
+
+    def solve_puzzle_parallel(self, workers=None):
+        """AI Solver splitting the search over a pool of worker processes"""
+        self.solution_steps = []
+        counts = search.solve_parallel(self.board, workers)
+        if counts is None:
+            self.message = "No solution found!"
+            self.message_color = RED
             return False
-        
-        # Try adding bridges to each valid neighbor
-        for neighbor in valid_neighbors:
-            for num_bridges in [1, 2]:
-                current_bridges = current_island.neighbors.get(neighbor, 0)
-                
-                if current_bridges + num_bridges > 2:
-                    continue
-                
-                if current_bridges + num_bridges > needed:
-                    continue
-                
-                # Add bridges
-                added = []
-                success = True
-                for _ in range(num_bridges):
-                    if current_island.can_add_bridge(neighbor, 0):
-                        if not self.check_bridge_crossing(current_island, neighbor):
-                            current_island.add_bridge(neighbor)
-                            added.append(neighbor)
-                        else:
-                            success = False
-                            break
-                    else:
-                        success = False
-                        break
-                
-                if success and added:
-                    # Try to continue
-                    if self._smart_backtrack(island_idx, depth + 1):
-                        return True
-                    
-                    # Backtrack
-                    for _ in added:
-                        current_island.remove_bridge(neighbor)
-        
-        # Try skipping this island
-        return self._smart_backtrack(island_idx + 1, depth + 1)
+        self.apply_edge_counts(counts)
+        self.message = "Puzzle solved by AI (parallel)!"
+        self.message_color = GREEN
+        return True
+
+    def apply_edge_counts(self, counts):
+        """Replace all bridges and log it as one move"""
+        self.set_edge_counts(counts)
+        self.moves.record_bulk(movelog.SET, counts)
+
+    def load_moves(self, moves):
+        """Continue from another MoveLog, taking over its bridges"""
+        self.moves = moves
+        self.set_edge_counts(moves.counts)
+        self.selected_island = None
+
+    def set_edge_counts(self, counts):
+        """Replace all bridges with one bridge count per board edge"""
+        for island in self.islands:
+            island.neighbors.clear()
+        for edge, count in enumerate(counts):
+            if count:
+                self._set_bridges(edge, count)
+
+    def _set_bridges(self, edge, count):
+        """Set the bridge count of one board edge"""
+        a, b, _ = self.board.edges[edge]
+        island1, island2 = self.islands[a], self.islands[b]
+        if count:
+            island1.neighbors[island2] = count
+            island2.neighbors[island1] = count
+        else:
+            island1.neighbors.pop(island2, None)
+            island2.neighbors.pop(island1, None)
+
+    def edge_counts(self):
+        """Current bridge count for every board edge"""
+        return [self.islands[a].neighbors.get(self.islands[b], 0) for a, b, _ in self.board.edges]
 
     def get_hint(self):
         """Provide a hint for the next move"""
@@ -446,16 +358,56 @@ class HashiGame:
             if len(valid_neighbors) == 1 and needed > 0:
                 return (island, valid_neighbors[0])
         
+        return self._deduced_hint()
+
+    def _deduced_hint(self):
+        """First bridge the solver deduces before it has to guess"""
+        counts = self.edge_counts()
+        for step in self.iter_solve_steps():
+            if step.kind != "deduce":
+                break
+            if step.lo > counts[step.edge]:
+                a, b, _ = self.board.edges[step.edge]
+                return (self.islands[a], self.islands[b])
         return None
 
     def reset(self):
         """Reset all bridges"""
         for island in self.islands:
             island.neighbors.clear()
+        self.moves.record_bulk(movelog.RESET, bytes(len(self.board.edges)))
         self.selected_island = None
         self.message = "Puzzle reset!"
         self.message_color = YELLOW
 
+    def undo(self):
+        """Undo the last bridge change"""
+        changes = self.moves.undo()
+        if changes is None:
+            self.message = "Nothing to undo"
+            self.message_color = WHITE
+            return False
+        for edge, count in changes:
+            self._set_bridges(edge, count)
+        self.selected_island = None
+        self.message = "Move undone"
+        self.message_color = YELLOW
+        return True
+
+    def redo(self):
+        """Redo the last undone bridge change"""
+        changes = self.moves.redo()
+        if changes is None:
+            self.message = "Nothing to redo"
+            self.message_color = WHITE
+            return False
+        for edge, count in changes:
+            self._set_bridges(edge, count)
+        self.selected_island = None
+        self.message = "Move redone"
+        self.message_color = YELLOW
+        return True
+
 # ========== DRAWING FUNCTIONS ==========
 def draw_grid(tile_size):
     """Draw semi-transparent grid lines"""
@@ -524,21 +476,23 @@ def draw_islands(game):
         pygame.draw.circle(screen, BLACK, (island.x, island.y), tile_size // 3, 2)
         
         # Draw the required degree number
-        text = font.render(str(island.required_degree), True, BLACK)
+        text = assets.get_font(FONT_SIZE).render(str(island.required_degree), True, BLACK)
         text_rect = text.get_rect(center=(island.x, island.y))
         screen.blit(text, text_rect)
 
 def draw_ui(game):
     """Draw UI elements: instructions, status, buttons"""
     # Message bar at top
+    small_font = assets.get_font(SMALL_FONT_SIZE)
     msg_surface = small_font.render(game.message, True, game.message_color)
     screen.blit(msg_surface, (10, 10))
     
     # Instructions at bottom
     instructions = [
-        "Click two islands to connect | R: Reset | S: AI Solve | H: Hint | ESC: Quit"
+        "Click two islands to connect | R: Reset | U/Y: Undo/Redo | ESC: Quit",
+        "S: AI Solve | P: Parallel Solve | H: Hint"
     ]
-    y_offset = WINDOW_HEIGHT - 30
+    y_offset = WINDOW_HEIGHT - 10 - 20 * len(instructions)
     for instruction in instructions:
         text = small_font.render(instruction, True, LIGHT_GREY)
         screen.blit(text, (10, y_offset))
@@ -546,7 +500,7 @@ def draw_ui(game):
     
     # Win check display
     if game.check_win():
-        win_text = font.render("PUZZLE SOLVED! Congratulations!", True, GREEN)
+        win_text = assets.get_font(FONT_SIZE).render("PUZZLE SOLVED! Congratulations!", True, GREEN)
         win_rect = win_text.get_rect(center=(WINDOW_WIDTH // 2, 30))
         pygame.draw.rect(screen, BLACK, win_rect.inflate(20, 10))
         screen.blit(win_text, win_rect)
@@ -566,11 +520,17 @@ def show_mode_screen(mode_name, matrix):
 
     Press ESC to return to the main menu.
     """
+    global screen
     # create a fresh game instance for this mode so each difficulty starts clean
     game = HashiGame(matrix)
 
-    font = pygame.font.SysFont(None, 90)
-    small = pygame.font.SysFont(None, 28)
+    screen = pygame.display.get_surface()
+    if screen is None:
+        pygame.init()
+        screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+
+    font = assets.get_font(90)
+    small = assets.get_font(28)
     hint = None
     while True:
         for event in pygame.event.get():
@@ -613,6 +573,12 @@ def show_mode_screen(mode_name, matrix):
                     # Reset puzzle
                     game.reset()
                     hint = None
+                elif event.key == pygame.K_u:
+                    game.undo()
+                    hint = None
+                elif event.key == pygame.K_y:
+                    game.redo()
+                    hint = None
                 elif event.key == pygame.K_s:
                         # AI Solve
                     game.message = "AI Solver running..."
@@ -623,6 +589,16 @@ def show_mode_screen(mode_name, matrix):
                     pygame.display.update()
                     game.solve_puzzle()
                     hint = None
+                elif event.key == pygame.K_p:
+                    # AI Solve on all cores
+                    game.message = "Parallel AI Solver running..."
+                    game.message_color = YELLOW
+                    draw_grid(tile_size)
+                    draw_islands(game)
+                    draw_ui(game)
+                    pygame.display.update()
+                    game.solve_puzzle_parallel()
+                    hint = None
                 elif event.key == pygame.K_h:
                     # Show hint
                     hint = game.get_hint()
@@ -0,0 +1,94 @@
+"""Checks of MoveLog packing, undo/redo, seeking and serialization.
+
+    python -m pytest test_movelog.py
+"""
+import random
+
+import pytest
+
+import movelog
+from movelog import MoveLog
+
+EDGES = 12
+
+
+def random_log(seed, moves=300, checkpoint_every=movelog.CHECKPOINT_EVERY):
+    """A log of random moves and the bridge counts after every entry"""
+    rng = random.Random(seed)
+    log = MoveLog(EDGES, checkpoint_every)
+    history = [bytes(EDGES)]
+    for _ in range(moves):
+        roll = rng.random()
+        if roll < 0.15:
+            log.undo()
+        elif roll < 0.25:
+            log.redo()
+        elif roll < 0.3:
+            log.record_bulk(movelog.RESET, bytes(EDGES))
+        elif roll < 0.35:
+            log.record_bulk(movelog.SET, bytes(rng.randint(0, 2) for _ in range(EDGES)))
+        else:
+            edge = rng.randrange(EDGES)
+            old = log.counts[edge]
+            log.record_toggle(edge, old, (old + 1) % 3)
+        if len(log) == len(history):
+            history.append(bytes(log.counts))
+    return log, history
+
+
+def test_pack_toggle_round_trip():
+    entry = movelog.pack_toggle(1000, 2, 1)
+    action, data = movelog.unpack(entry)
+    assert action == movelog.TOGGLE
+    assert movelog.unpack_toggle(data) == (1000, 2, 1)
+
+
+@pytest.mark.parametrize("checkpoint_every", [8, movelog.CHECKPOINT_EVERY])
+@pytest.mark.parametrize("seed", range(5))
+def test_seek_matches_replay(seed, checkpoint_every):
+    log, history = random_log(seed, checkpoint_every=checkpoint_every)
+    assert len(log) > 2 * checkpoint_every
+    for position, counts in enumerate(history):
+        assert log.seek(position) == counts
+
+
+def test_undo_redo_set():
+    log = MoveLog(3)
+    log.record_toggle(0, 0, 1)
+    log.record_toggle(2, 0, 2)
+    before = bytes(log.counts)
+    log.record_bulk(movelog.SET, bytes([2, 1, 0]))
+
+    assert log.undo() == [(0, 1), (1, 0), (2, 2)]
+    assert bytes(log.counts) == before
+    assert log.redo() == [(0, 2), (1, 1), (2, 0)]
+    assert bytes(log.counts) == bytes([2, 1, 0])
+
+
+def test_undo_reset():
+    log = MoveLog(2)
+    log.record_toggle(1, 0, 2)
+    log.record_bulk(movelog.RESET, bytes(2))
+    log.undo()
+    assert bytes(log.counts) == bytes([0, 2])
+    assert log.seek(len(log)) == bytes([0, 2])
+
+
+def test_nothing_to_undo_or_redo():
+    log = MoveLog(2)
+    assert log.undo() is None
+    assert log.redo() is None
+    assert len(log) == 0
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_bytes_round_trip(seed):
+    log, history = random_log(seed)
+    copy = MoveLog.from_bytes(log.to_bytes())
+    assert copy.entries == log.entries
+    assert copy.counts == log.counts
+    assert copy.snapshots == log.snapshots
+    assert copy.applied == log.applied
+    assert copy.undone == log.undone
+    for position, counts in enumerate(history):
+        assert copy.seek(position) == counts
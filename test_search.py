@@ -0,0 +1,48 @@
+"""Checks that the eager and the streaming solvers agree.
+
+    python -m pytest test_search.py
+"""
+import pytest
+
+import search
+from solver import HashiGame
+
+UNSOLVABLE = [
+    [[1]],
+    [[3, 0, 0], [0, 0, 0], [0, 0, 0]],
+    [[2, 0, 1], [0, 0, 0], [0, 0, 0]],
+    [[1, 0, 1], [0, 0, 0], [1, 0, 0]],
+]
+
+SOLVABLE = [
+    [[2, 0, 2], [0, 0, 0], [0, 0, 0]],
+    [[1, 0, 2], [0, 0, 0], [0, 0, 1]],
+    [[2, 0, 3, 0, 1], [0, 0, 0, 0, 0], [2, 0, 4, 0, 2], [0, 0, 0, 0, 0], [0, 0, 1, 0, 1]],
+]
+
+
+def streamed_solution(board):
+    for step in search.solve_steps(board):
+        if step.kind == "solution":
+            return step.lo
+    return None
+
+
+@pytest.mark.parametrize("matrix", UNSOLVABLE)
+def test_unsolvable_boards(matrix):
+    board = search.Board(matrix)
+    assert search.solve(board) is None
+    assert streamed_solution(board) is None
+    game = HashiGame(matrix)
+    assert not game.solve_puzzle()
+    assert not game.check_win()
+
+
+@pytest.mark.parametrize("matrix", SOLVABLE)
+def test_solvable_boards(matrix):
+    board = search.Board(matrix)
+    assert search.solve(board) is not None
+    assert streamed_solution(board) is not None
+    game = HashiGame(matrix)
+    assert game.solve_puzzle()
+    assert game.check_win()